@@ -4,3 +4,6 @@ DB_PORT = 3306
 DB_USER = "admin"
 DB_PASSWORD = "laplandia"
 DB_NAME = "StockProjectDB"
+
+# Price Cache Configuration
+PRICE_CACHE_DIR = "cache"
@@ -1,35 +1,68 @@
+import glob
+import io
+import multiprocessing
+import os
+import tempfile
 import warnings
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from functools import lru_cache
 
+import numpy as np
 import pandas as pd
+from numba import njit
 import yfinance as yf
+import matplotlib
+
+matplotlib.use("Agg")  # headless backend, pages only go to PDF
+
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.backends.backend_pdf import PdfPages
-from mplfinance.original_flavor import candlestick_ohlc
-from sqlalchemy import create_engine
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba
+from pypdf import PdfWriter
+from sqlalchemy import create_engine, text
+
+from config import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME, PRICE_CACHE_DIR
 
-from config import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME
+warnings.filterwarnings("ignore")  # match notebook behaviour
 
+# Merge nearly collinear line segments so long price/MA paths stay small
+plt.rcParams["path.simplify"] = True
+plt.rcParams["path.simplify_threshold"] = 1.0
 
+# Date axis ticks shared by every page: one tick per month
+DATE_LOCATOR = mdates.MonthLocator()
+DATE_FORMATTER = mdates.DateFormatter("%Y-%m-%d")
+
+
+@lru_cache(maxsize=1)
 def create_engine_from_config():
     """
-    Create a SQLAlchemy engine using credentials from config.py.
+    Create a pooled SQLAlchemy engine using credentials from config.py.
+    The engine is built once per process and reused, keeping its pool warm.
     """
     connection_string = (
         f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     )
-    return create_engine(connection_string)
+    # Recycle connections before MySQL's wait_timeout drops them while idle
+    return create_engine(
+        connection_string,
+        pool_size=8,
+        max_overflow=0,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+    )
 
 
 def fetch_strong_buy_stocks(engine, min_market_cap: float, min_close_vs_200: float, max_close_vs_200: float, rec_key: str):
     """
     Fetch stocks from the Stocks table filtered by Rec_Key, Market_cap, and Close_vs_200 range.
     """
-    # Basic sanitization to avoid breaking the SQL if user types a quote
-    rec_key_safe = rec_key.replace("'", "''")
-
-    query_filtered = f"""
+    # Filter values are bound as parameters, so the statement text stays
+    # constant between runs and user input never ends up in the SQL
+    query_filtered = text("""
     SELECT 
         symbol,
         Target_LP,
@@ -42,238 +75,553 @@ def fetch_strong_buy_stocks(engine, min_market_cap: float, min_close_vs_200: flo
         `MTD Change`,
         `YTD Change`
     FROM Stocks 
-    WHERE Rec_Key = '{rec_key_safe}'
+    WHERE Rec_Key = :rec_key
       AND Country = 'United States'
-      AND Market_cap > {min_market_cap}
-      AND Close_vs_200 >= {min_close_vs_200}
-      AND Close_vs_200 <= {max_close_vs_200}
+      AND Market_cap > :min_market_cap
+      AND Close_vs_200 >= :min_close_vs_200
+      AND Close_vs_200 <= :max_close_vs_200
     
+    """)
+
+    df = pd.read_sql(
+        query_filtered,
+        engine,
+        params={
+            "rec_key": rec_key,
+            "min_market_cap": min_market_cap,
+            "min_close_vs_200": min_close_vs_200,
+            "max_close_vs_200": max_close_vs_200,
+        },
+        dtype={
+            "Target_LP": "float64",
+            "Target_Mean_P": "float64",
+            "Rec_Mean": "float64",
+            "Market_Cap": "float64",
+            "Anlsts": "Int64",
+        },
+    )
+    # MTD/YTD changes may arrive as strings or NULL; convert them once here
+    # so the plotting loop can use them as plain floats
+    for column in ("MTD Change", "YTD Change"):
+        df[column] = pd.to_numeric(df[column], errors="coerce").fillna(0.0)
+    return df
+
+
+@njit(cache=True, error_model="numpy")
+def compute_indicators(closes: np.ndarray):
     """
+    Compute the 50/200-day moving averages and 14-day Wilder RSI for one
+    ticker's closes (its own trading days only) in a single pass.
+    The MAs match rolling(window, min_periods=1).mean() and the RSI matches
+    ewm(alpha=1/14, adjust=False) on the clipped diffs, NaNs included.
+    Returns (ma_50, ma_200, rsi) arrays shaped like closes.
+    """
+    n_rows = closes.size
+    ma_50 = np.empty_like(closes)
+    ma_200 = np.empty_like(closes)
+    rsi = np.empty_like(closes)
+    alpha = 1.0 / 14
+
+    sum_50 = 0.0
+    sum_200 = 0.0
+    count_50 = 0
+    count_200 = 0
+    avg_gain = np.nan
+    avg_loss = np.nan
+    old_weight = 1.0
+
+    for i in range(n_rows):
+        close = closes[i]
+
+        # Trailing window sums over the valid closes only
+        if close == close:
+            sum_50 += close
+            sum_200 += close
+            count_50 += 1
+            count_200 += 1
+        if i >= 50 and closes[i - 50] == closes[i - 50]:
+            sum_50 -= closes[i - 50]
+            count_50 -= 1
+        if i >= 200 and closes[i - 200] == closes[i - 200]:
+            sum_200 -= closes[i - 200]
+            count_200 -= 1
+        ma_50[i] = sum_50 / count_50 if count_50 > 0 else np.nan
+        ma_200[i] = sum_200 / count_200 if count_200 > 0 else np.nan
+
+        # Wilder's smoothing of gains and losses; a missing change decays
+        # the previous average's weight the same way pandas ewm does
+        delta = close - closes[i - 1] if i > 0 else np.nan
+        if avg_gain == avg_gain:
+            old_weight *= 1 - alpha
+            if delta == delta:
+                avg_gain = (old_weight * avg_gain + alpha * max(delta, 0.0)) / (old_weight + alpha)
+                avg_loss = (old_weight * avg_loss + alpha * max(-delta, 0.0)) / (old_weight + alpha)
+                old_weight = 1.0
+        elif delta == delta:
+            avg_gain = max(delta, 0.0)
+            avg_loss = max(-delta, 0.0)
+        rsi[i] = 100 - (100 / (1 + avg_gain / avg_loss))
+
+    return ma_50, ma_200, rsi
+
+
+def _price_cache_path(ticker: str, start: str, day: str) -> str:
+    """
+    Path of the cached price history for a ticker downloaded on a given day.
+    """
+    safe_ticker = ticker.replace("/", "_")
+    return os.path.join(PRICE_CACHE_DIR, f"{safe_ticker}_{start}_{day}.pkl")
+
+
+def _store_cached_prices(ticker: str, start: str, day: str, stock_data: pd.DataFrame):
+    """
+    Write a ticker's price history to the cache and drop copies from earlier days.
+    The file is written under a temporary name and renamed into place, so an
+    interrupted run never leaves a truncated cache entry behind.
+    """
+    path = _price_cache_path(ticker, start, day)
+    for stale_path in glob.glob(_price_cache_path(ticker, start, "*")):
+        if stale_path != path:
+            os.remove(stale_path)
+
+    fd, tmp_path = tempfile.mkstemp(dir=PRICE_CACHE_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        stock_data.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
 
-    df = pd.read_sql(query_filtered, engine)
-    return df
+
+def _load_cached_prices(path: str):
+    """
+    Read a cached price history, or return None if it is missing or unreadable.
+    Unreadable files are deleted so the ticker is downloaded again.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_pickle(path)
+    except Exception as e:
+        print(f"Discarding unreadable price cache {path}: {e}")
+        os.remove(path)
+        return None
+
+
+def _ticker_frame(bulk: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """
+    Slice one ticker's columns out of a batched yf.download result.
+    Returns an empty DataFrame if Yahoo returned nothing for the ticker.
+    """
+    if bulk.empty:
+        return pd.DataFrame()
+    # A single-ticker download comes back with flat columns on older yfinance
+    if not isinstance(bulk.columns, pd.MultiIndex):
+        return bulk
+    # yfinance upper-cases symbols, so look them up the same way
+    symbol = ticker.upper()
+    if symbol not in bulk.columns.get_level_values(0):
+        return pd.DataFrame()
+    return bulk[symbol]
+
+
+def download_price_data(tickers: list, start: str = "2024-01-01") -> dict:
+    """
+    Load daily price history for all tickers, reading today's copies from the
+    on-disk cache and downloading the rest in one batched Yahoo Finance request.
+    Returns a dict mapping ticker -> DataFrame (empty if Yahoo had no data).
+    """
+    tickers = [str(t) for t in tickers]
+    today = date.today().isoformat()
+    os.makedirs(PRICE_CACHE_DIR, exist_ok=True)
+
+    price_data = {}
+    missing = []
+    for ticker in tickers:
+        stock_data = _load_cached_prices(_price_cache_path(ticker, start, today))
+        if stock_data is not None:
+            price_data[ticker] = stock_data
+        else:
+            missing.append(ticker)
+
+    if not missing:
+        return price_data
+
+    bulk = yf.download(
+        missing,
+        start=start,
+        group_by="ticker",
+        threads=True,
+        progress=False,
+        auto_adjust=False,
+    )
+
+    for ticker in missing:
+        # The batched frame is aligned on a shared date index, so drop the
+        # rows where this ticker did not trade
+        stock_data = _ticker_frame(bulk, ticker).dropna(how="all")
+        price_data[ticker] = stock_data
+        # Only cache real data so tickers Yahoo failed on are retried next run
+        if not stock_data.empty:
+            _store_cached_prices(ticker, start, today, stock_data)
+    return price_data
+
+
+def add_indicators(price_data: dict) -> dict:
+    """
+    Compute the 50/200-day moving averages and RSI for every ticker with one
+    compiled pass over that ticker's own closes, so windows and price changes
+    never span days on which only other tickers traded.
+    Returns a dict mapping ticker -> price DataFrame with 50_MA, 200_MA and RSI
+    columns added (tickers without price data are passed through unchanged).
+    The indicators are computed in float64; prices and indicators are then
+    stored as float32, which is plenty for plotting.
+    """
+    plot_dtypes = {
+        column: np.float32
+        for column in ("Open", "High", "Low", "Close", "200_MA", "50_MA", "RSI")
+    }
+    with_indicators = dict(price_data)
+    for ticker, stock_data in price_data.items():
+        if stock_data.empty:
+            continue
+
+        # Calculate moving averages and RSI (Relative Strength Index)
+        ma_50, ma_200, rsi = compute_indicators(
+            stock_data["Close"].to_numpy(dtype=np.float64)
+        )
+        with_indicators[ticker] = stock_data.assign(
+            **{"200_MA": ma_200, "50_MA": ma_50, "RSI": rsi}
+        ).astype(plot_dtypes)
+    return with_indicators
+
+
+def downsample_bars(bars: dict, max_bars: int):
+    """
+    Merge consecutive bars into buckets so at most max_bars remain,
+    keeping each bucket's OHLC range and its last indicator values.
+    bars maps Date, Open, High, Low, Close, 200_MA, 50_MA and RSI to
+    equal-length arrays.
+    Returns the (possibly unchanged) bars and the number of bars per bucket.
+    In the result, Date is each bucket's last bar, matching the Close and
+    indicator values plotted as lines, and Candle_Date is its first bar,
+    where the candle body is placed.
+    """
+    n_bars = len(bars["Date"])
+    if n_bars <= max_bars:
+        return dict(bars, Candle_Date=bars["Date"]), 1
+
+    bucket_size = -(-n_bars // max_bars)  # ceiling division
+    firsts = np.arange(0, n_bars, bucket_size)
+    lasts = np.minimum(firsts + bucket_size, n_bars) - 1
+
+    downsampled = {column: values[lasts] for column, values in bars.items()}
+    downsampled["Candle_Date"] = bars["Date"][firsts]
+    downsampled["Open"] = bars["Open"][firsts]
+    downsampled["High"] = np.fmax.reduceat(bars["High"], firsts)
+    downsampled["Low"] = np.fmin.reduceat(bars["Low"], firsts)
+    return downsampled, bucket_size
+
+
+def plot_candlesticks(ax, ohlc: np.ndarray, width: float, colorup: str, colordown: str, alpha: float):
+    """
+    Draw candlesticks from (date, open, high, low, close) rows using one
+    collection for all wicks and one for all bodies.
+    Returns the (wicks, bodies) collections.
+    """
+    dates, opens, highs, lows, closes = ohlc.T
+    is_up = (closes >= opens)[:, None]
+    line_colors = np.where(is_up, to_rgba(colorup), to_rgba(colordown))
+    body_colors = np.where(is_up, to_rgba(colorup, alpha), to_rgba(colordown, alpha))
+
+    # Wicks run from low to high at each date
+    wick_segments = np.stack(
+        [np.column_stack([dates, lows]), np.column_stack([dates, highs])], axis=1
+    )
+
+    # Bodies span open to close, centred on each date
+    left = dates - width / 2
+    right = dates + width / 2
+    bottom = np.minimum(opens, closes)
+    top = np.maximum(opens, closes)
+    body_polygons = np.stack(
+        [
+            np.column_stack([left, bottom]),
+            np.column_stack([left, top]),
+            np.column_stack([right, top]),
+            np.column_stack([right, bottom]),
+        ],
+        axis=1,
+    )
+
+    wicks = LineCollection(wick_segments, colors=line_colors, linewidths=0.5)
+    bodies = PolyCollection(body_polygons, facecolors=body_colors, edgecolors=body_colors)
+    ax.add_collection(wicks)
+    ax.add_collection(bodies)
+    ax.autoscale_view()
+    return wicks, bodies
+
+
+# Figure and axes reused for every page rendered by this process
+_page_figure = None
+
+
+def _get_page_figure():
+    """
+    Return the (figure, price axes, RSI axes) used to render pages in this
+    process, creating them on first use.
+    """
+    global _page_figure
+    if _page_figure is None:
+        # Create figure with subplots: price chart and RSI
+        fig = plt.figure(figsize=(24, 12), constrained_layout=True)
+        gs = fig.add_gridspec(2, 1, height_ratios=[3, 1])
+        ax1 = fig.add_subplot(gs[0])
+        ax3 = fig.add_subplot(gs[1], sharex=ax1)
+        _page_figure = (fig, ax1, ax3)
+    return _page_figure
+
+
+def _init_render_worker():
+    """
+    Prepare a worker process for page rendering by building its figure up front.
+    """
+    _get_page_figure()
+
+
+def render_page(ticker: str, stock_row: dict, stock_data: pd.DataFrame, rec_key: str) -> bytes:
+    """
+    Render the technical analysis chart for one ticker and return it
+    as the bytes of a single-page PDF. stock_data must already carry the
+    50_MA, 200_MA and RSI columns (see add_indicators).
+    """
+    target_lp = stock_row["Target_LP"]
+    target_mean_p = stock_row["Target_Mean_P"]
+    sector = stock_row["Sector"]
+    anlsts = stock_row["Anlsts"]
+    rec_mean = stock_row["Rec_Mean"]
+    market_cap = stock_row["Market_Cap"]
+    mtd_change = stock_row["MTD Change"]
+    ytd_change = stock_row["YTD Change"]
+
+    # Plot straight from the frame's arrays, with dates in matplotlib format
+    bars = {"Date": mdates.date2num(stock_data.index.to_numpy())}
+    for column in ("Open", "High", "Low", "Close", "200_MA", "50_MA", "RSI"):
+        bars[column] = stock_data[column].to_numpy()
+
+    # Reuse this process's figure, clearing whatever the previous page drew
+    fig, ax1, ax3 = _get_page_figure()
+    ax1.clear()
+    ax3.clear()
+
+    # Drawing more bars than the figure is pixels wide only adds overlapping
+    # artists, so bucket long histories down to roughly one bar per pixel
+    max_bars = int(fig.get_size_inches()[0] * fig.dpi)
+    bars, bucket_size = downsample_bars(bars, max_bars)
+
+    # Main price chart: candlesticks and moving averages
+    # Build the float32 (date, open, high, low, close) rows in one array;
+    # float32 still resolves dates to a few minutes
+    ohlc = np.column_stack(
+        [bars[column] for column in ("Candle_Date", "Open", "High", "Low", "Close")]
+    ).astype(np.float32, copy=False)
+    plot_candlesticks(
+        ax1,
+        ohlc,
+        width=0.6 * bucket_size,
+        colorup="g",
+        colordown="r",
+        alpha=0.8,
+    )
+
+    # Plot moving averages
+    ax1.plot(
+        bars["Date"],
+        bars["200_MA"],
+        color="red",
+        label="200-Day MA",
+        linewidth=2,
+        alpha=0.7,
+    )
+    ax1.plot(
+        bars["Date"],
+        bars["50_MA"],
+        color="blue",
+        label="50-Day MA",
+        linewidth=2,
+        alpha=0.7,
+    )
+
+    # Add PCT metrics as horizontal reference lines
+    ax1.axhline(
+        y=target_lp,
+        color="#FF6B6B",
+        linestyle="--",
+        label=f"Target_LP: {target_lp:.1f}%",
+        linewidth=2,
+        alpha=0.7,
+    )
+    ax1.axhline(
+        y=target_mean_p,
+        color="#4ECDC4",
+        linestyle="--",
+        label=f"Target_Mean_P: {target_mean_p:.1f}%",
+        linewidth=2,
+        alpha=0.7,
+    )
+
+    # Updated title to include sector, Rec_Key, Anlsts, Rec_Mean, Market_Cap, MTD Change, and YTD Change
+    ax1.set_title(
+        f"{ticker} - {sector} - ({rec_key}) - Anlsts: {anlsts}, Rec_Mean: {rec_mean}, Market_Cap: {market_cap}, MTD: {mtd_change:.2f}%, YTD: {ytd_change:.2f}%",
+        fontsize=18,
+        fontweight="bold",
+        pad=20,
+    )
+    ax1.set_ylabel("Price ($)", fontsize=12)
+    ax1.grid(True, alpha=0.3)
+    ax1.legend(loc="upper left", fontsize=10)
+
+    # Format x-axis (show diagonal dates on price chart)
+    ax1.xaxis.set_major_formatter(DATE_FORMATTER)
+    ax1.xaxis.set_major_locator(DATE_LOCATOR)
+    ax1.tick_params(axis="x", labelrotation=45)
+
+    # RSI subplot
+    ax3.plot(
+        bars["Date"],
+        bars["RSI"],
+        color="purple",
+        linewidth=1.5,
+    )
+    ax3.axhline(
+        y=70,
+        color="r",
+        linestyle="--",
+        alpha=0.5,
+        label="Overbought (70)",
+    )
+    ax3.axhline(
+        y=30,
+        color="g",
+        linestyle="--",
+        alpha=0.5,
+        label="Oversold (30)",
+    )
+    ax3.fill_between(
+        bars["Date"],
+        30,
+        70,
+        alpha=0.1,
+        color="gray",
+    )
+    ax3.set_ylabel("RSI", fontsize=12)
+    ax3.set_ylim(0, 100)
+    ax3.set_xlabel("Date", fontsize=12)
+    ax3.grid(True, alpha=0.3)
+    ax3.legend(loc="upper right", fontsize=9)
+
+    # Format bottom x-axis
+    ax3.xaxis.set_major_formatter(DATE_FORMATTER)
+    ax3.xaxis.set_major_locator(DATE_LOCATOR)
+    ax3.tick_params(axis="x", labelrotation=45)
+
+    # Get current price info from the raw arrays
+    last_closes = stock_data["Close"].to_numpy()[-2:]
+    current_price = last_closes[-1]
+    price_change = current_price - last_closes[-2]
+    price_change_pct = price_change / last_closes[-2] * 100
+    ma_50 = stock_data["50_MA"].to_numpy()[-1]
+    ma_200 = stock_data["200_MA"].to_numpy()[-1]
+    rsi_value = stock_data["RSI"].to_numpy()[-1]
+
+    # Add text box with current stats
+    stats_text = (
+        f"Current: ${current_price:.2f} ({price_change_pct:+.2f}%)\n"
+    )
+    stats_text += f"50 MA: ${ma_50:.2f}\n"
+    stats_text += f"200 MA: ${ma_200:.2f}\n"
+    stats_text += f"RSI: {rsi_value:.1f}"
+    ax1.text(
+        0.01,
+        0.78,
+        stats_text,
+        transform=ax1.transAxes,
+        fontsize=10,
+        verticalalignment="top",
+        bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.8),
+    )
+
+    # Save the figure as a one-page PDF in memory; it stays open for the next page.
+    # The page size is fixed, so skip the extra render a tight bounding box
+    # needs, and leave out the per-page creation date
+    page = io.BytesIO()
+    with PdfPages(page, metadata={"CreationDate": None}) as pdf:
+        pdf.savefig(fig, bbox_inches=None, pad_inches=0)
+    return page.getvalue()
 
 
 def generate_technical_analysis_pdf(df: pd.DataFrame, output_path: str, rec_key: str):
     """
     Generate a multi-page PDF with technical analysis charts
     for each symbol in df (filtered by the chosen Rec_Key).
+    Pages are rendered in parallel worker processes and merged in order.
     """
     if df is None or df.empty:
         print(f"No data returned for Rec_Key = '{rec_key}'. Nothing to plot.")
         return
 
     list_of_stocks = df["symbol"].tolist()
-
-    warnings.filterwarnings("ignore")  # match notebook behaviour
-
-    with PdfPages(output_path) as pdf:
-        for ticker in list_of_stocks:
-            try:
-                # Get the value metrics for this stock
-                stock_row = df[df["symbol"] == ticker].iloc[0]
-                target_lp = stock_row["Target_LP"]
-                target_mean_p = stock_row["Target_Mean_P"]
-                sector = stock_row["Sector"]
-                anlsts = stock_row["Anlsts"]
-                rec_mean = stock_row["Rec_Mean"]
-                market_cap = stock_row["Market_Cap"]
-                # Convert MTD and YTD changes to float, handling None or string values
+    # Index the metadata by symbol once so each ticker is a hash lookup
+    meta = df.drop_duplicates("symbol").set_index("symbol", drop=False)
+
+    # Fetch all price histories up front instead of one request per ticker
+    price_data = download_price_data(list_of_stocks)
+    price_data = add_indicators(price_data)
+
+    jobs = []
+    for ticker in list_of_stocks:
+        stock_data = price_data[str(ticker)]
+        if stock_data.empty:
+            print(f"Skipping {ticker}: no price data from Yahoo Finance.")
+            continue
+
+        # Get the value metrics for this stock
+        stock_row = meta.loc[ticker].to_dict()
+        jobs.append((ticker, stock_row, stock_data))
+
+    writer = PdfWriter()
+    if jobs:
+        # Each worker is a full interpreter, so start no more than there are
+        # pages; Windows also caps a process pool at 61 workers
+        max_workers = min(len(jobs), os.cpu_count() or 1, 61)
+
+        # Matplotlib is not fork-safe everywhere, so always spawn fresh workers
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_render_worker,
+        ) as executor:
+            futures = [
+                (ticker, executor.submit(render_page, ticker, stock_row, stock_data, rec_key))
+                for ticker, stock_row, stock_data in jobs
+            ]
+
+            for ticker, future in futures:
                 try:
-                    mtd_change = float(stock_row["MTD Change"]) if pd.notna(stock_row["MTD Change"]) else 0.0
-                except (ValueError, TypeError):
-                    mtd_change = 0.0
-                try:
-                    ytd_change = float(stock_row["YTD Change"]) if pd.notna(stock_row["YTD Change"]) else 0.0
-                except (ValueError, TypeError):
-                    ytd_change = 0.0
-
-                # Fetch stock data from Yahoo Finance
-                stock_data = yf.download(
-                    str(ticker), start="2024-01-01", progress=False, auto_adjust=False
-                )
-
-                if stock_data.empty:
-                    print(f"Skipping {ticker}: no price data from Yahoo Finance.")
+                    writer.append(io.BytesIO(future.result()))
+                    print(f"Added {ticker} page to {output_path}")
+                except Exception as e:
+                    print(f"Error processing {ticker}: {e}")
                     continue
 
-                # Calculate moving averages
-                stock_data["200_MA"] = stock_data["Close"].rolling(
-                    window=200, min_periods=1
-                ).mean()
-                stock_data["50_MA"] = stock_data["Close"].rolling(
-                    window=50, min_periods=1
-                ).mean()
-
-                # Calculate RSI (Relative Strength Index)
-                delta = stock_data["Close"].diff()
-                gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-                loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-                rs = gain / loss
-                stock_data["RSI"] = 100 - (100 / (1 + rs))
-
-                # Convert index to matplotlib date format
-                stock_data_reset = stock_data.reset_index()
-                stock_data_reset["Date"] = stock_data_reset["Date"].apply(
-                    mdates.date2num
-                )
-
-                # Create figure with subplots: price chart and RSI
-                fig = plt.figure(figsize=(24, 12))
-                gs = fig.add_gridspec(2, 1, height_ratios=[3, 1], hspace=0.3)
-
-                # Main price chart with candlesticks and moving averages
-                ax1 = fig.add_subplot(gs[0])
-
-                # Plot candlestick chart
-                candlestick_ohlc(
-                    ax1,
-                    stock_data_reset[["Date", "Open", "High", "Low", "Close"]].values,
-                    width=0.6,
-                    colorup="g",
-                    colordown="r",
-                    alpha=0.8,
-                )
-
-                # Plot moving averages
-                ax1.plot(
-                    stock_data_reset["Date"],
-                    stock_data_reset["200_MA"],
-                    color="red",
-                    label="200-Day MA",
-                    linewidth=2,
-                    alpha=0.7,
-                )
-                ax1.plot(
-                    stock_data_reset["Date"],
-                    stock_data_reset["50_MA"],
-                    color="blue",
-                    label="50-Day MA",
-                    linewidth=2,
-                    alpha=0.7,
-                )
-
-                # Add PCT metrics as horizontal reference lines
-                ax1.axhline(
-                    y=target_lp,
-                    color="#FF6B6B",
-                    linestyle="--",
-                    label=f"Target_LP: {target_lp:.1f}%",
-                    linewidth=2,
-                    alpha=0.7,
-                )
-                ax1.axhline(
-                    y=target_mean_p,
-                    color="#4ECDC4",
-                    linestyle="--",
-                    label=f"Target_Mean_P: {target_mean_p:.1f}%",
-                    linewidth=2,
-                    alpha=0.7,
-                )
-
-                # Updated title to include sector, Rec_Key, Anlsts, Rec_Mean, Market_Cap, MTD Change, and YTD Change
-                ax1.set_title(
-                    f"{ticker} - {sector} - ({rec_key}) - Anlsts: {anlsts}, Rec_Mean: {rec_mean}, Market_Cap: {market_cap}, MTD: {mtd_change:.2f}%, YTD: {ytd_change:.2f}%",
-                    fontsize=18,
-                    fontweight="bold",
-                    pad=20,
-                )
-                ax1.set_ylabel("Price ($)", fontsize=12)
-                ax1.grid(True, alpha=0.3)
-                ax1.legend(loc="upper left", fontsize=10)
-
-                # Format x-axis (show diagonal dates on price chart)
-                ax1.xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d"))
-                ax1.xaxis.set_major_locator(mdates.MonthLocator())
-                plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45)
-
-                # RSI subplot
-                ax3 = fig.add_subplot(gs[1], sharex=ax1)
-                ax3.plot(
-                    stock_data_reset["Date"],
-                    stock_data_reset["RSI"],
-                    color="purple",
-                    linewidth=1.5,
-                )
-                ax3.axhline(
-                    y=70,
-                    color="r",
-                    linestyle="--",
-                    alpha=0.5,
-                    label="Overbought (70)",
-                )
-                ax3.axhline(
-                    y=30,
-                    color="g",
-                    linestyle="--",
-                    alpha=0.5,
-                    label="Oversold (30)",
-                )
-                ax3.fill_between(
-                    stock_data_reset["Date"],
-                    30,
-                    70,
-                    alpha=0.1,
-                    color="gray",
-                )
-                ax3.set_ylabel("RSI", fontsize=12)
-                ax3.set_ylim(0, 100)
-                ax3.set_xlabel("Date", fontsize=12)
-                ax3.grid(True, alpha=0.3)
-                ax3.legend(loc="upper right", fontsize=9)
-
-                # Format bottom x-axis
-                ax3.xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d"))
-                ax3.xaxis.set_major_locator(mdates.MonthLocator())
-                plt.setp(ax3.xaxis.get_majorticklabels(), rotation=45)
-
-                # Get current price info safely as scalars
-                close_series = stock_data["Close"]
-                ma_50_series = stock_data["50_MA"]
-                ma_200_series = stock_data["200_MA"]
-                rsi_series = stock_data["RSI"]
-
-                current_price = float(close_series.iloc[-1])
-                price_change = float(close_series.iloc[-1] - close_series.iloc[-2])
-                price_change_pct = float(
-                    (price_change / close_series.iloc[-2]) * 100
-                )
-                ma_50 = float(ma_50_series.iloc[-1])
-                ma_200 = float(ma_200_series.iloc[-1])
-                rsi_value = float(rsi_series.iloc[-1])
-
-                # Add text box with current stats
-                stats_text = (
-                    f"Current: ${current_price:.2f} ({price_change_pct:+.2f}%)\n"
-                )
-                stats_text += f"50 MA: ${ma_50:.2f}\n"
-                stats_text += f"200 MA: ${ma_200:.2f}\n"
-                stats_text += f"RSI: {rsi_value:.1f}"
-                ax1.text(
-                    0.01,
-                    0.78,
-                    stats_text,
-                    transform=ax1.transAxes,
-                    fontsize=10,
-                    verticalalignment="top",
-                    bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.8),
-                )
-
-                plt.tight_layout()
-
-                # Save current figure as a new page in the PDF and close it
-                pdf.savefig(fig)
-                plt.close(fig)
-
-                print(f"Added {ticker} page to {output_path}")
-
-            except PermissionError as e:
-                print(f"Error processing {ticker}: Permission denied. Please close the PDF file '{output_path}' if it's open in another program.")
-                print(f"Full error: {e}")
-                continue
-            except Exception as e:
-                print(f"Error processing {ticker}: {e}")
-                continue
+    try:
+        with open(output_path, "wb") as output_file:
+            writer.write(output_file)
+    except PermissionError as e:
+        print(f"Error writing {output_path}: Permission denied. Please close the PDF file '{output_path}' if it's open in another program.")
+        print(f"Full error: {e}")
+        return
 
     print(f"PDF report created: {output_path}")
 